@@ -1,11 +1,11 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import re
 import io
 import argparse
 import numpy as np # For calculating the average hash rate safely
 import platform # Import platform module
 import subprocess # Import subprocess to run sysctl
+from pathlib import Path
 
 # --- Argument Parsing ---
 parser = argparse.ArgumentParser(description='Plot mining difficulty vs nonce count and time.')
@@ -22,89 +22,130 @@ INPUT_FILENAME = args.input_file
 OUTPUT_PLOT_FILENAME = "difficulty_vs_metrics.png" # Back to original name
 
 # --- Get CPU Info ---
-cpu_info = "Unknown CPU" # Default value
+# Cached per machine (keyed by uname) so repeat runs skip the detection below
+CPU_INFO_CACHE = Path.home() / '.cache' / 'qpow-benchmark' / 'cpuinfo'
+uname = platform.uname()
+cpu_info_key = '|'.join((uname.system, uname.node, uname.release, uname.version, uname.machine))
+
+cpu_info = None
 try:
-    system = platform.system()
-    if system == "Darwin": # macOS specific check
-        try:
-            # Use sysctl to get the detailed CPU brand string on macOS
-            result = subprocess.run(
-                ['sysctl', '-n', 'machdep.cpu.brand_string'],
-                capture_output=True, text=True, check=True
-            )
-            cpu_info = result.stdout.strip()
-        except (FileNotFoundError, subprocess.CalledProcessError, Exception) as e:
-             print(f"Warning: Could not get detailed CPU info via sysctl: {e}")
-             # Fallback to platform.processor() or uname on macOS if sysctl fails
+    cached_key, cached_info = CPU_INFO_CACHE.read_text().split('\n', 1)
+    if cached_key == cpu_info_key:
+        cpu_info = cached_info
+except (OSError, ValueError):
+    pass # No usable cache, detect below
+
+if cpu_info is None:
+    cpu_info = "Unknown CPU" # Default value
+    cpu_info_detected = False # Only values from the primary source below are cached, never fallbacks
+    try:
+        system = platform.system()
+        if system == "Darwin": # macOS specific check
+            try:
+                # Use sysctl to get the detailed CPU brand string on macOS
+                result = subprocess.run(
+                    ['sysctl', '-n', 'machdep.cpu.brand_string'],
+                    capture_output=True, text=True, check=True
+                )
+                cpu_info = result.stdout.strip()
+                cpu_info_detected = bool(cpu_info)
+            except (FileNotFoundError, subprocess.CalledProcessError, Exception) as e:
+                 print(f"Warning: Could not get detailed CPU info via sysctl: {e}")
+                 # Fallback to platform.processor() or uname on macOS if sysctl fails
+                 cpu_info = platform.processor()
+                 if not cpu_info:
+                     uname_info = platform.uname()
+                     cpu_info = f"{uname_info.machine} (macOS fallback)"
+
+        elif system == "Linux":
+            # On Linux, try reading /proc/cpuinfo for model name
+            try:
+                with open('/proc/cpuinfo') as f:
+                     for line in f:
+                         if line.strip().startswith('model name'):
+                             cpu_info = line.split(':', 1)[1].strip()
+                             cpu_info_detected = bool(cpu_info)
+                             break # Found the first model name
+                # Fallback if 'model name' not found
+                if cpu_info == "Unknown CPU":
+                    cpu_info = platform.processor()
+                    if not cpu_info:
+                        uname_info = platform.uname()
+                        cpu_info = f"{uname_info.machine} (Linux fallback)"
+            except FileNotFoundError:
+                 print("Warning: /proc/cpuinfo not found.")
+                 cpu_info = platform.processor() or f"{platform.uname().machine} (Linux fallback)"
+
+        elif system == "Windows":
+             cpu_info = platform.processor() # platform.processor often works well on Windows
+             cpu_info_detected = bool(cpu_info)
+             if not cpu_info:
+                 cpu_info = f"{platform.uname().machine} (Windows fallback)"
+
+        else: # Other OS
              cpu_info = platform.processor()
              if not cpu_info:
-                 uname_info = platform.uname()
-                 cpu_info = f"{uname_info.machine} (macOS fallback)"
+                  uname_info = platform.uname()
+                  cpu_info = f"{uname_info.machine} / {system} (fallback)"
 
-    elif system == "Linux":
-        # On Linux, try reading /proc/cpuinfo for model name
-        try:
-            with open('/proc/cpuinfo') as f:
-                 for line in f:
-                     if line.strip().startswith('model name'):
-                         cpu_info = line.split(':', 1)[1].strip()
-                         break # Found the first model name
-            # Fallback if 'model name' not found
-            if cpu_info == "Unknown CPU":
-                cpu_info = platform.processor()
-                if not cpu_info:
-                    uname_info = platform.uname()
-                    cpu_info = f"{uname_info.machine} (Linux fallback)"
-        except FileNotFoundError:
-             print("Warning: /proc/cpuinfo not found.")
-             cpu_info = platform.processor() or f"{platform.uname().machine} (Linux fallback)"
-
-    elif system == "Windows":
-         cpu_info = platform.processor() or f"{platform.uname().machine} (Windows fallback)" # platform.processor often works well on Windows
-
-    else: # Other OS
-         cpu_info = platform.processor()
-         if not cpu_info:
-              uname_info = platform.uname()
-              cpu_info = f"{uname_info.machine} / {system} (fallback)"
+    except Exception as e:
+        print(f"Warning: Error detecting CPU info: {e}")
+        cpu_info = "Unknown CPU" # Ensure it has a default
+        cpu_info_detected = False
 
-except Exception as e:
-    print(f"Warning: Error detecting CPU info: {e}")
-    cpu_info = "Unknown CPU" # Ensure it has a default
+    if cpu_info_detected:
+        try:
+            CPU_INFO_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            CPU_INFO_CACHE.write_text(f"{cpu_info_key}\n{cpu_info}")
+        except OSError as e:
+            print(f"Warning: Could not cache CPU info: {e}")
 
-data = []
-# Regex updated to capture the "Avg Time" again
-line_regex = re.compile(r"Difficulty:\s*(\d+),\s*Average Nonce Count:\s*([\d\.]+),\s*Avg Time:\s*([\d\.]+)\s*s,\s*Aggregate Hash Rate:\s*([\d\.]+)")
+# Data lines have fixed fields, in this order:
+# Difficulty: X, Average Nonce Count: Y, Avg Time: Z s, Aggregate Hash Rate: W (solutions/s)
+labels = ["Difficulty", "Average Nonce Count", "Avg Time", "Aggregate Hash Rate"]
+columns = ["Difficulty", "AvgNonceCount", "AvgTime", "AggHashRate"]
 
 print(f"Reading data from {INPUT_FILENAME}...")
 try:
+    rows = []
     with open(INPUT_FILENAME, 'r') as f:
         for line in f:
-            match = line_regex.match(line.strip())
-            if match:
-                try:
-                    difficulty = int(match.group(1))
-                    avg_nonce_count = float(match.group(2))
-                    avg_time = float(match.group(3)) # Capture Avg Time
-                    agg_hash_rate = float(match.group(4))
-                    data.append({
-                        "Difficulty": difficulty,
-                        "AvgNonceCount": avg_nonce_count,
-                        "AvgTime": avg_time, # Store Avg Time
-                        "AggHashRate": agg_hash_rate
-                    })
-                except ValueError:
-                    print(f"Warning: Could not parse numbers in line: {line.strip()}")
-
-    if not data:
+            line = line.strip()
+            if not line.startswith("Difficulty:"):
+                continue
+            fields = line.split(',', len(labels) - 1)
+            # The benchmark prints "Difficulty: X,NaN,NaN,..." when no sample found a nonce
+            if len(fields) > 1 and fields[1].strip() == "NaN":
+                print(f"Skipping difficulty {fields[0].split(':', 1)[1].strip()}: no successful samples")
+                continue
+            try:
+                if len(fields) != len(labels):
+                    raise ValueError
+                # Take the number after each "Name:", dropping trailing units like " s"
+                values = []
+                for field, label in zip(fields, labels):
+                    name, value = field.split(':', 1)
+                    if name.strip() != label:
+                        raise ValueError
+                    value = value.split()[0]
+                    if not value.replace('.', '').isdigit(): # Plain decimals only, no inf/nan/exponents
+                        raise ValueError
+                    values.append(value)
+                # Difficulty is a u64, keep it an exact int; the rest are floats
+                rows.append([int(values[0])] + [float(value) for value in values[1:]])
+            except (IndexError, ValueError):
+                print(f"Warning: Could not parse numbers in line: {line}")
+
+    data = pd.DataFrame(rows, columns=columns)
+
+    if data.empty:
          print("Error: No valid data lines found in the file. Did the Rust program run correctly?")
          print(f"Check the contents of '{INPUT_FILENAME}'. Expecting lines like:")
          # Updated example format
          print("Difficulty: 56000000000, Average Nonce Count: 886.08, Avg Time: 1.207 s, Aggregate Hash Rate: 4555.75")
          exit()
 
-    df = pd.DataFrame(data)
-    df = df.sort_values(by="Difficulty") # Sort by difficulty for plotting
+    df = data.sort_values(by="Difficulty") # Sort by difficulty for plotting
 
     # --- Scale Difficulty by 1 million ---
     df["DifficultyMillions"] = df["Difficulty"] / 1e6
@@ -124,8 +165,7 @@ try:
     fig.suptitle(f'Mining Metrics vs. Difficulty on {cpu_info}\n(Overall Avg. Aggregate Hash Rate: {overall_avg_hash_rate:.2f} Nonces/s)')
 
     # Plot 1: Difficulty vs Average Nonce Count
-    ax1.scatter(df["DifficultyMillions"], df["AvgNonceCount"], label="Measured Data")
-    ax1.plot(df["DifficultyMillions"], df["AvgNonceCount"], linestyle='--', alpha=0.6, label="Trend (linear assumption)")
+    ax1.plot(df["DifficultyMillions"], df["AvgNonceCount"], marker='o', linestyle='--', alpha=0.6, label="Measured Data (linear trend)")
     ax1.set_ylabel("Average Nonce Count")
     ax1.set_title("Difficulty vs. Average Nonce Count") # Can add title back if preferred
     ax1.grid(True)
@@ -133,8 +173,7 @@ try:
     ax1.ticklabel_format(style='plain', axis='y')
 
     # Plot 2: Difficulty vs Average Time per Solution
-    ax2.scatter(df["DifficultyMillions"], df["AvgTime"], label="Measured Data", color='orange') # Use different color
-    ax2.plot(df["DifficultyMillions"], df["AvgTime"], linestyle='--', alpha=0.6, label="Trend (linear assumption)", color='red')
+    ax2.plot(df["DifficultyMillions"], df["AvgTime"], marker='o', linestyle='--', alpha=0.6, label="Measured Data (linear trend)", color='orange') # Use different color
     ax2.set_xlabel("Difficulty (Millions)") # Set x-label on the bottom plot
     ax2.set_ylabel("Average Time per Solution (s)")
     ax2.set_title("Difficulty vs. Average Time per Solution")
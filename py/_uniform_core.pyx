@@ -0,0 +1,143 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+# Compiled per-sample kernel for uniform.py: random header, SHA-256/SHA-512,
+# hash_to_group and the SHA-512 of its result, all in C with the GIL released.
+# Built on import by pyximport (see _uniform_core.pyxbld), needs GMP and OpenSSL.
+import os
+import numpy as np
+from cython.parallel import prange
+from libc.stdint cimport int64_t
+from libc.string cimport memset
+
+cdef extern from "gmp.h" nogil:
+    ctypedef struct __mpz_struct:
+        pass
+    ctypedef __mpz_struct mpz_t[1]
+    ctypedef struct __gmp_randstate_struct:
+        pass
+    ctypedef __gmp_randstate_struct gmp_randstate_t[1]
+
+    void mpz_init(mpz_t)
+    void mpz_clear(mpz_t)
+    void mpz_import(mpz_t, size_t, int, size_t, int, size_t, const void *)
+    void *mpz_export(void *, size_t *, int, size_t, int, size_t, const mpz_t)
+    size_t mpz_sizeinbase(const mpz_t, int)
+    int mpz_cmp_ui(const mpz_t, unsigned long)
+    int mpz_odd_p(const mpz_t)
+    void mpz_add(mpz_t, const mpz_t, const mpz_t)
+    void mpz_add_ui(mpz_t, const mpz_t, unsigned long)
+    void mpz_sub_ui(mpz_t, const mpz_t, unsigned long)
+    void mpz_mul_ui(mpz_t, const mpz_t, unsigned long)
+    void mpz_tdiv_r_2exp(mpz_t, const mpz_t, unsigned long)
+    void mpz_tdiv_q_2exp(mpz_t, const mpz_t, unsigned long)
+    unsigned long mpz_get_ui(const mpz_t)
+    void mpz_gcd(mpz_t, const mpz_t, const mpz_t)
+    void mpz_powm(mpz_t, const mpz_t, const mpz_t, const mpz_t)
+    void mpz_urandomm(mpz_t, gmp_randstate_t, const mpz_t)
+    void gmp_randinit_default(gmp_randstate_t)
+    void gmp_randseed(gmp_randstate_t, const mpz_t)
+    void gmp_randclear(gmp_randstate_t)
+
+cdef extern from "openssl/evp.h" nogil:
+    ctypedef struct EVP_MD:
+        pass
+    ctypedef struct ENGINE:
+        pass
+    const EVP_MD *EVP_sha256()
+    const EVP_MD *EVP_sha512()
+    int EVP_Digest(const void *, size_t, unsigned char *, unsigned int *, const EVP_MD *, ENGINE *)
+
+cdef extern from "openssl/rand.h" nogil:
+    int RAND_bytes(unsigned char *, int)
+
+cdef int _sample_range(long num_samples, int num_bins, int64_t *bins_before, int64_t *bins_after) noexcept nogil:
+    cdef unsigned char header[64]
+    cdef unsigned char digest[64]
+    cdef unsigned char result_bytes[64]
+    cdef unsigned char seed[32]
+    cdef mpz_t h_int, m, n, s, g, result
+    cdef gmp_randstate_t state
+    cdef size_t num_bytes, count
+    cdef long i
+    cdef int status = 0
+
+    if RAND_bytes(seed, 32) != 1:
+        return -1
+    mpz_init(h_int); mpz_init(m); mpz_init(n); mpz_init(s); mpz_init(g); mpz_init(result)
+    gmp_randinit_default(state)
+    mpz_import(g, 32, 1, 1, 1, 0, seed)
+    gmp_randseed(state, g)
+
+    for i in range(num_samples):
+        # Simulate a block header (as a 512-bit integer)
+        if RAND_bytes(header, 64) != 1:
+            status = -1
+            break
+        EVP_Digest(header, 64, digest, NULL, EVP_sha256(), NULL)
+        mpz_import(m, 32, 1, 1, 1, 0, digest)
+        EVP_Digest(header, 64, digest, NULL, EVP_sha512(), NULL)
+        mpz_import(n, 64, 1, 1, 1, 0, digest)
+
+        # s = random.randint(1, n)
+        mpz_urandomm(s, state, n)
+        mpz_add_ui(s, s, 1)
+
+        # hash_to_group: same coprimality adjustment as the Python version
+        mpz_gcd(g, m, n)
+        if mpz_cmp_ui(g, 1) != 0:
+            if mpz_odd_p(m):
+                mpz_sub_ui(m, m, 1)
+            else:
+                mpz_add_ui(m, m, 1)
+        mpz_import(h_int, 64, 1, 1, 1, 0, header)
+        mpz_add(h_int, h_int, s)
+        mpz_tdiv_r_2exp(h_int, h_int, 512)  # Simulate U512 addition
+        mpz_powm(result, m, h_int, n)
+
+        # Before: (result / 2^512) * num_bins on the top 64 bits, like bin_outputs
+        mpz_tdiv_q_2exp(g, result, 448)
+        mpz_mul_ui(g, g, num_bins)
+        mpz_tdiv_q_2exp(g, g, 64)
+        bins_before[mpz_get_ui(g)] += 1
+
+        # After: SHA-512 of the 64-byte result, binned on its top 64 bits like bin_digests
+        memset(result_bytes, 0, 64)
+        num_bytes = (mpz_sizeinbase(result, 2) + 7) // 8
+        mpz_export(result_bytes + 64 - num_bytes, &count, 1, 1, 1, 0, result)
+        EVP_Digest(result_bytes, 64, digest, NULL, EVP_sha512(), NULL)
+        mpz_import(g, 8, 1, 1, 1, 0, digest)
+        mpz_mul_ui(g, g, num_bins)
+        mpz_tdiv_q_2exp(g, g, 64)
+        bins_after[mpz_get_ui(g)] += 1
+
+    gmp_randclear(state)
+    mpz_clear(h_int); mpz_clear(m); mpz_clear(n); mpz_clear(s); mpz_clear(g); mpz_clear(result)
+    return status
+
+def sample_batch(long num_samples, int num_bins, int num_chunks=0):
+    """Generate num_samples outputs and return (bins_before, bins_after) as int64 arrays."""
+    # The kernel writes bins through raw pointers, so reject sizes that would go out of bounds
+    if num_bins < 1:
+        raise ValueError(f"num_bins must be at least 1, got {num_bins}")
+    if num_samples < 0:
+        raise ValueError(f"num_samples must be non-negative, got {num_samples}")
+    if num_chunks <= 0:
+        num_chunks = os.cpu_count() or 1
+    num_chunks = max(1, min(num_chunks, num_samples))
+
+    # One histogram row per chunk, so the parallel loop needs no atomics
+    before = np.zeros((num_chunks, num_bins), dtype=np.int64)
+    after = np.zeros((num_chunks, num_bins), dtype=np.int64)
+    status = np.zeros(num_chunks, dtype=np.int32)
+    cdef int64_t[:, ::1] before_view = before
+    cdef int64_t[:, ::1] after_view = after
+    cdef int[::1] status_view = status
+    cdef long chunk_size = num_samples // num_chunks
+    cdef long remainder = num_samples % num_chunks
+    cdef Py_ssize_t t
+
+    for t in prange(num_chunks, nogil=True, schedule='dynamic'):
+        status_view[t] = _sample_range(chunk_size + (t < remainder), num_bins, &before_view[t, 0], &after_view[t, 0])
+
+    if status.any():
+        raise RuntimeError("OpenSSL RAND_bytes failed")
+    return before.sum(axis=0), after.sum(axis=0)
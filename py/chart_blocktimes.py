@@ -14,8 +14,13 @@ print('block_times: {}'.format(block_times))
 block_times = np.array(block_times)
 
 # Configuration
-min_time = min(block_times)  # Start of first bucket
-max_time = max(block_times)  # End of last bucket
+min_time = block_times.min()  # Start of first bucket
+max_time = block_times.max()  # End of last bucket
+
+# Descriptive statistics, computed once and reused by the fits and the summary
+mean_time = block_times.mean()
+median_time = np.median(block_times)
+std_time = block_times.std()
 
 # Histogram with density normalization
 bin_width = 10
@@ -23,12 +28,15 @@ bins = np.arange(0, max_time + bin_width, bin_width)
 counts, bins, _ = plt.hist(block_times, bins=bins, edgecolor='black', alpha=0.7, density=True)
 
 # Fit shifted exponential distribution (let loc be estimated)
-loc, scale = expon.fit(block_times)  # loc is not fixed, allowing shift
+# Closed-form MLE, same result as expon.fit: loc = min, scale = mean - min
+loc, scale = min_time, mean_time - min_time
 exp_pdf = expon.pdf(bins, loc=loc, scale=scale)
 plt.plot(bins, exp_pdf, 'r-', label=f'Exponential (loc={loc:.2f}, scale={scale:.2f})')
 
 # Fit log-normal distribution
-shape, loc, scale = lognorm.fit(block_times, floc=0)
+# Closed-form MLE with loc fixed at 0, same result as lognorm.fit(floc=0)
+log_times = np.log(block_times)
+shape, loc, scale = log_times.std(), 0, np.exp(log_times.mean())
 lognorm_pdf = lognorm.pdf(bins, shape, loc=loc, scale=scale)
 plt.plot(bins, lognorm_pdf, 'g-', label=f'Log-Normal (shape={shape:.2f})')
 
@@ -40,8 +48,6 @@ plt.title('Histogram of Block Times')
 plt.grid(True, alpha=0.3)
 
 # Optional: Add median and average lines
-median_time = np.median(block_times)
-mean_time = np.mean(block_times)
 plt.axvline(median_time, color='red', linestyle='--', label=f'Median: {median_time:.2f}s')
 plt.axvline(mean_time, color='green', linestyle='--', label=f'Mean: {mean_time:.2f}s')
 plt.legend()
@@ -51,8 +57,8 @@ print(f"Number of blocks: {len(block_times)}")
 print(f"Median block time: {median_time:.2f} ms")
 print(f"Mean block time: {mean_time:.2f} ms")
 print(f"Mean / median: {mean_time/median_time:.2f}")
-print(f"Standard deviation: {np.std(block_times):.2f} ms")
-print(f"Coeff of variation: {np.std(block_times)/mean_time:.2f}")
+print(f"Standard deviation: {std_time:.2f} ms")
+print(f"Coeff of variation: {std_time/mean_time:.2f}")
 
 
 # Show plot